@@ -1,5 +1,21 @@
 #!/usr/bin/env python3
 
-__all__ = ["redact"]
+from typing import TYPE_CHECKING
 
-from .utils import redact
+__all__ = ["iter_redact", "redact"]
+
+if TYPE_CHECKING:
+    from .utils import iter_redact, redact
+
+
+def __getattr__(name: str):
+    # import utils (and thus pfs.datamodel) on first use, not on package import
+    if name in __all__:
+        from . import utils
+
+        return getattr(utils, name)
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+
+def __dir__() -> list[str]:
+    return sorted(list(globals()) + __all__)
@@ -1,23 +1,48 @@
 #!/usr/bin/env python3
 
 import copy
+import functools
 import logging
+from collections.abc import Iterable, Iterator, Mapping, Sequence
+from concurrent.futures import ThreadPoolExecutor
 from dataclasses import dataclass
 from pprint import pformat
-from typing import Union
+from types import MappingProxyType
 
 import numpy as np
 from pfs.datamodel import PfsConfig, TargetType
 
-# Basic configuration
-logging.basicConfig(
-    level=logging.INFO,
-    format="%(asctime)s - %(name)s - %(levelname)s - %(message)s",
-)
-
 # Get a logger for your module
 logger = logging.getLogger(__name__)
 
+# Default keys to be masked and their mask values (catId is set by cat_id)
+_DEFAULT_DICT_MASK: Mapping[str, int | str | float] = MappingProxyType(
+    {
+        "tract": -1,
+        "patch": "-1,-1",
+        "ra": -99,
+        "dec": -99,
+        "pmRa": 0.0,
+        "pmDec": 0.0,
+        "parallax": 1.0e-7,
+        "proposalId": "masked",
+        "obCode": "masked",
+        "pfiNominal": (np.nan, np.nan),
+        "pfiCenter": (np.nan, np.nan),
+        "targetType": TargetType.SCIENCE_MASKED,
+    }
+)
+
+# Default keys for flux values to be masked
+_DEFAULT_FLUX_KEYS: tuple[str, ...] = (
+    "fiberFlux",
+    "psfFlux",
+    "totalFlux",
+    "fiberFluxErr",
+    "psfFluxErr",
+    "totalFluxErr",
+)
+
 
 # define a dataclass for the redaccted pfsConfig
 @dataclass
@@ -37,16 +62,207 @@ class RedactedPfsConfigDataClass:
     pfs_config: PfsConfig
 
 
-def redact(
+def _is_dense(values) -> bool:
+    """
+    Check whether per-fiber values are stored as a rectangular array.
+
+    Parameters
+    ----------
+    values : numpy.ndarray or list
+        Per-fiber values such as flux or filter names.
+
+    Returns
+    -------
+    bool
+        True if ``values`` is an ndarray of a non-object dtype, False for
+        ragged per-fiber lists or object arrays.
+    """
+
+    return isinstance(values, np.ndarray) and values.dtype != object
+
+
+def _fast_clone(pfs_config: PfsConfig, writable_keys: Iterable[str]) -> PfsConfig:
+    """
+    Copy the PfsConfig object, duplicating only the attributes to be modified.
+
+    Parameters
+    ----------
+    pfs_config : PfsConfig
+        The PfsConfig object to be copied.
+    writable_keys : iterable of str
+        Names of the attributes to be modified in the copy. All the other
+        attributes except ``header`` are shared with the original PfsConfig
+        object.
+
+    Returns
+    -------
+    PfsConfig
+        A shallow copy of the PfsConfig object with its own copies of the
+        header and the attributes in ``writable_keys``.
+    """
+
+    new_cfg = copy.copy(pfs_config)
+    # the header is small; a per-output copy lets callers update it freely
+    new_cfg.header = pfs_config.header.copy()
+    for k in writable_keys:
+        setattr(new_cfg, k, getattr(pfs_config, k).copy())
+    return new_cfg
+
+
+def _redact_proposal(
+    pfs_config: PfsConfig,
+    propid_work: str,
+    i_fiber_propid: np.ndarray,
+    n_fiber_work: int,
+    *,
+    dict_mask: dict[str, int | str | float],
+    flux_keys: Sequence[str],
+    flux_val: float,
+    filter_val: str,
+    writable_keys: set[str],
+    is_maskable: np.ndarray,
+    flux_fill: dict[str, dict[tuple[np.dtype, tuple[int, ...]], np.ndarray]],
+    filter_row_len: np.ndarray | None,
+    filter_fill: dict[int, list[str]],
+) -> RedactedPfsConfigDataClass:
+    """
+    Redact the PfsConfig object for a single proposal ID.
+
+    Parameters
+    ----------
+    pfs_config : PfsConfig
+        The PfsConfig object to be redacted. It is not modified.
+    propid_work : str
+        The proposal ID whose targets are kept unmasked.
+    i_fiber_propid : numpy.ndarray
+        Indices of the fibers assigned to ``propid_work``.
+    n_fiber_work : int
+        The number of SCIENCE fibers assigned to ``propid_work``.
+    dict_mask : dict
+        A dictionary defining keys to be masked and their mask values.
+    flux_keys : list
+        A list of keys for flux values to be masked.
+    flux_val : float
+        The value to be used for masking flux values.
+    filter_val : str
+        The value to be used for masking filter values.
+    writable_keys : set of str
+        Names of the attributes modified by masking.
+    is_maskable : numpy.ndarray
+        Boolean array selecting SCIENCE fibers assigned to a proposal.
+    flux_fill : dict
+        Arrays filled with ``flux_val`` for flux keys stored as ragged
+        lists, keyed by the dtype and shape of the rows they replace. Flux
+        keys not included are rectangular arrays.
+    filter_row_len : numpy.ndarray or None
+        Number of filters per fiber if filterNames is a ragged list,
+        None if it is a rectangular array.
+    filter_fill : dict
+        Masked filter names for ragged filterNames, keyed by the number of
+        filters. The lists are shared by all masked fibers of that length.
+
+    Returns
+    -------
+    RedactedPfsConfigDataClass
+        The redacted PfsConfig object for ``propid_work``.
+
+    Raises
+    ------
+    ValueError
+        If the number of unmasked SCIENCE fibers in the redacted PfsConfig
+        does not match the number of SCIENCE fibers for ``propid_work``.
+    """
+
+    logger.info("Processing proposal ID %s", propid_work)
+
+    # Get and log the catIds associated with this proposal ID
+    if logger.isEnabledFor(logging.INFO):
+        catids_for_proposal = pfs_config.catId[i_fiber_propid]
+        unique_catids = np.unique(catids_for_proposal).tolist()
+        logger.info("  Associated catIds: %s", unique_catids)
+
+    # Select SCIENCE fibers assigned to the other proposals
+    idx_mask = is_maskable.copy()
+    idx_mask[i_fiber_propid] = False
+    i_fiber_masked = np.flatnonzero(idx_mask)
+
+    n_fiber_masked: int = i_fiber_masked.size
+    n_fiber_unmasked: int = pfs_config.fiberId.size - n_fiber_masked
+
+    if n_fiber_masked > 0:
+        # Create a copy of the original PfsConfig to redact
+        redacted_cfg = _fast_clone(pfs_config, writable_keys)
+
+        # Generate object ID before masking catId
+        objid = redacted_cfg.objId
+        objid[idx_mask] = np.negative(pfs_config.fiberId[idx_mask]).astype(
+            objid.dtype, copy=False
+        )
+
+        # Mask values
+        for k, v in dict_mask.items():
+            getattr(redacted_cfg, k)[idx_mask] = v
+
+        # NOTE: keep the number of elements for flux and filter information
+        for k in flux_keys:
+            flux = getattr(redacted_cfg, k)
+            if k in flux_fill:
+                # ragged list of per-fiber arrays; each row keeps its dtype and shape
+                fill = flux_fill[k]
+                for i_fiber in i_fiber_masked:
+                    row = np.asarray(flux[i_fiber])
+                    flux[i_fiber] = fill[row.dtype, row.shape].copy()
+            else:
+                flux[idx_mask] = flux_val
+
+        filter_names = redacted_cfg.filterNames
+        if filter_row_len is None:
+            filter_names[idx_mask] = filter_val
+        else:
+            # ragged list of per-fiber filter names
+            for i_fiber in i_fiber_masked:
+                filter_names[i_fiber] = filter_fill[filter_row_len[i_fiber]]
+    else:
+        # Nothing to mask; share all the arrays with the original
+        redacted_cfg = copy.copy(pfs_config)
+        redacted_cfg.header = pfs_config.header.copy()
+
+    # Count unmasked SCIENCE fibers belonging to current proposal
+    idx_unmasked_science = redacted_cfg.targetType == TargetType.SCIENCE
+    idx_unmasked_science &= redacted_cfg.proposalId == propid_work
+    n_fiber_unmasked_science: int = np.count_nonzero(idx_unmasked_science)
+
+    logger.info("  Number of SCIENCE fibers for %s: %s", propid_work, n_fiber_work)
+    logger.info("  Number of masked fibers for %s: %s", propid_work, n_fiber_masked)
+    logger.info("  Number of unmasked fibers for %s: %s", propid_work, n_fiber_unmasked)
+    logger.info("  Number of unmasked SCIENCE fibers: %s", n_fiber_unmasked_science)
+
+    if n_fiber_work != n_fiber_unmasked_science:
+        logger.error(
+            f"  Number of SCIENCE fibers for {propid_work} ({n_fiber_work}) does not match the number of unmasked SCIENCE fibers ({n_fiber_unmasked_science})."
+        )
+        raise ValueError(
+            f"Number of SCIENCE fibers for {propid_work} ({n_fiber_work}) does not match the number of unmasked SCIENCE fibers ({n_fiber_unmasked_science})."
+        )
+
+    return RedactedPfsConfigDataClass(proposal_id=propid_work, pfs_config=redacted_cfg)
+
+
+def iter_redact(
     pfs_config: PfsConfig,
     cat_id: int = 9000,
-    dict_mask: dict[str, Union[int, str, float]] | None = None,
-    flux_keys: list[str] | None = None,
+    dict_mask: dict[str, int | str | float] | None = None,
+    flux_keys: Sequence[str] | None = None,
     flux_val: float | None = None,
     filter_val: str | None = None,
-) -> list[RedactedPfsConfigDataClass]:
+    max_workers: int | None = None,
+) -> Iterator[RedactedPfsConfigDataClass]:
     """
-    Redact the PfsConfig object by masking sensitive information.
+    Redact the PfsConfig object, yielding one proposal ID at a time.
+
+    Unlike `redact`, the redacted PfsConfig objects are generated lazily so
+    that each can be written out and released before the next proposal ID is
+    processed.
 
     Parameters
     ----------
@@ -64,41 +280,30 @@ def redact(
         The value to be used for masking flux values. Default is np.nan.
     filter_val : str, optional
         The value to be used for masking filter values. Default is "none".
-
-    Returns
-    -------
-    list[RedactedPfsConfigDataClass]
-        A list of RedactedPfsConfigDataClass objects containing the redacted
-        PfsConfig objects and their associated proposal IDs.
+    max_workers : int, optional
+        The maximum number of threads used to redact proposal IDs in
+        parallel. If None or 1 (default), proposal IDs are processed
+        sequentially and only on demand.
+
+    Yields
+    ------
+    RedactedPfsConfigDataClass
+        The redacted PfsConfig object and its associated proposal ID.
+
+    Notes
+    -----
+    The redacted PfsConfig objects are shallow copies which share the
+    arrays not modified by masking with ``pfs_config``. If no fiber is
+    masked for a proposal ID, all the arrays are shared. Each object has its
+    own copy of ``header``, but the arrays of the yielded objects must be
+    treated as read-only.
     """
 
     if dict_mask is None:
-        # A dictionary defining keys to be masked and their mask values.
-        dict_mask = {
-            "catId": cat_id,
-            "tract": -1,
-            "patch": "-1,-1",
-            "ra": -99,
-            "dec": -99,
-            "pmRa": 0.0,
-            "pmDec": 0.0,
-            "parallax": 1.0e-7,
-            "proposalId": "masked",
-            "obCode": "masked",
-            "pfiNominal": (np.nan, np.nan),
-            "pfiCenter": (np.nan, np.nan),
-            "targetType": TargetType.SCIENCE_MASKED,
-        }
+        dict_mask = {"catId": cat_id, **_DEFAULT_DICT_MASK}
 
     if flux_keys is None:
-        flux_keys = [
-            "fiberFlux",
-            "psfFlux",
-            "totalFlux",
-            "fiberFluxErr",
-            "psfFluxErr",
-            "totalFluxErr",
-        ]
+        flux_keys = _DEFAULT_FLUX_KEYS
 
     if flux_val is None:
         flux_val = np.nan
@@ -106,112 +311,178 @@ def redact(
     if filter_val is None:
         filter_val = "none"
 
-    logger.info(f"Starting redaction of {pfs_config.header['FRAMEID']}")
-    logger.info(f"  pfsDesignId: {pfs_config.pfsDesignId:#016x}")
-    logger.info(f"  pfsDesignName: {pfs_config.designName}")
+    logger.info("Starting redaction of %s", pfs_config.header["FRAMEID"])
+    logger.info("  pfsDesignId: %#016x", pfs_config.pfsDesignId)
+    logger.info("  pfsDesignName: %s", pfs_config.designName)
 
     orig_proposal_id = pfs_config.header.get("PROP-ID")
-    logger.info(f"  Original proposal ID: {orig_proposal_id}")
+    logger.info("  Original proposal ID: %s", orig_proposal_id)
+
+    is_science = pfs_config.targetType == TargetType.SCIENCE
 
-    n_fiber_science: int = np.sum(pfs_config.targetType == TargetType.SCIENCE)
-    n_fiber_sky: int = np.sum(pfs_config.targetType == TargetType.SKY)
-    n_fiber_fluxstd: int = np.sum(pfs_config.targetType == TargetType.FLUXSTD)
-    logger.info(f"  Number of fibers: {len(pfs_config.fiberId)}")
-    logger.info(f"  Number of SCIENCE fibers: {n_fiber_science}")
-    logger.info(f"  Number of SKY fibers: {n_fiber_sky}")
-    logger.info(f"  Number of FLUXSTD fibers: {n_fiber_fluxstd}")
+    n_fiber_science: int = np.count_nonzero(is_science)
+    n_fiber_sky: int = np.count_nonzero(pfs_config.targetType == TargetType.SKY)
+    n_fiber_fluxstd: int = np.count_nonzero(pfs_config.targetType == TargetType.FLUXSTD)
+    logger.info("  Number of fibers: %s", len(pfs_config.fiberId))
+    logger.info("  Number of SCIENCE fibers: %s", n_fiber_science)
+    logger.info("  Number of SKY fibers: %s", n_fiber_sky)
+    logger.info("  Number of FLUXSTD fibers: %s", n_fiber_fluxstd)
 
     # Handle empty arrays case
     if len(pfs_config.fiberId) == 0:
         logger.info("  No fibers found, returning empty list")
-        return []
-
-    # Get unique proposal IDs only (not grouped by catId)
-    proposal_ids = list(set(pfs_config.proposalId))
-    # convert from np._str to str
-    proposal_ids = [str(s) for s in proposal_ids]
-
-    logger.info(f"  Unique proposal IDs: {pformat(proposal_ids)}")
-
-    # Initialize the list to hold redacted PfsConfig objects
-    redacted_pfsconfigs: list[RedactedPfsConfigDataClass] = []
-
-    for i, propid_work in enumerate(proposal_ids):
-        # skip if the proposal ID is "N/A"
-        if propid_work == "N/A":
-            logger.info("Ignoring the proposal ID N/A")
-            continue
-
-        logger.info(f"Processing proposal ID {propid_work}")
-
-        # Get and log the catIds associated with this proposal ID
-        catids_for_proposal = pfs_config.catId[pfs_config.proposalId == propid_work]
-        unique_catids = sorted(set(int(x) for x in catids_for_proposal))
-        logger.info(f"  Associated catIds: {unique_catids}")
-
-        # Get the number of SCIENCE fibers for targets from this proposal ID
-        idx_propid = np.logical_and(
-            pfs_config.proposalId == propid_work,
-            pfs_config.targetType == TargetType.SCIENCE,
-        )
-        n_fiber_work = np.sum(idx_propid)
-
-        # Create a copy of the original PfsConfig to redact
-        redacted_cfg = copy.deepcopy(pfs_config)
-
-        n_fiber_masked: int = 0
-        n_fiber_unmasked: int = 0
-        n_fiber_unmasked_science: int = 0
-
-        for i_fiber in range(pfs_config.fiberId.size):
-
-            if (
-                (redacted_cfg.proposalId[i_fiber] != "N/A")
-                and (redacted_cfg.proposalId[i_fiber] != propid_work)
-                and (redacted_cfg.targetType[i_fiber] == TargetType.SCIENCE)
-            ):
-                # Generate hashed object ID before masking catId
-                redacted_cfg.objId[i_fiber] = int(-1 * pfs_config.fiberId[i_fiber])
+        return
+
+    # Get unique proposal IDs only (not grouped by catId) and, for each fiber,
+    # the index of its proposal ID to compare proposals as integers
+    # NOTE: tolist() converts np.str_ to str
+    unique_proposal_ids, proposal_codes = np.unique(
+        pfs_config.proposalId, return_inverse=True
+    )
+    proposal_ids: list[str] = unique_proposal_ids.tolist()
+
+    if logger.isEnabledFor(logging.INFO):
+        logger.info("  Unique proposal IDs: %s", pformat(proposal_ids))
+
+    # skip the proposal ID "N/A"
+    na_code = -1
+    if "N/A" in proposal_ids:
+        logger.info("Ignoring the proposal ID N/A")
+        na_code = proposal_ids.index("N/A")
+    propid_codes = [code for code in range(len(proposal_ids)) if code != na_code]
+    proposal_ids = [proposal_ids[code] for code in propid_codes]
+
+    # Attributes modified by masking; only these are copied for each proposal
+    writable_keys = set(dict_mask) | set(flux_keys) | {"filterNames", "objId"}
+
+    # Fibers which can be masked, i.e., SCIENCE fibers assigned to a proposal
+    is_maskable = is_science & (proposal_codes != na_code)
+
+    # Bucket fibers by proposal ID in a single pass
+    n_fiber_by_code = np.bincount(proposal_codes, minlength=len(unique_proposal_ids))
+    fibers_by_code = np.split(
+        np.argsort(proposal_codes, kind="stable"), np.cumsum(n_fiber_by_code)[:-1]
+    )
+    i_fiber_by_propid = [fibers_by_code[code] for code in propid_codes]
+    n_science_by_code = np.bincount(
+        proposal_codes[is_science], minlength=len(unique_proposal_ids)
+    )
+    n_science_by_propid = n_science_by_code[propid_codes].tolist()
+
+    # Masked values for flux and filter information stored as ragged lists.
+    # Nothing is masked unless there are two or more proposal IDs.
+    flux_fill: dict[str, dict[tuple[np.dtype, tuple[int, ...]], np.ndarray]] = {}
+    filter_row_len: np.ndarray | None = None
+    filter_fill: dict[int, list[str]] = {}
+    if len(proposal_ids) > 1 and np.any(is_maskable):
+        i_fiber_maskable = np.flatnonzero(is_maskable)
+        for k in flux_keys:
+            flux = getattr(pfs_config, k)
+            if not _is_dense(flux):
+                flux_fill[k] = {}
+                for i_fiber in i_fiber_maskable:
+                    row = np.asarray(flux[i_fiber])
+                    if (row.dtype, row.shape) not in flux_fill[k]:
+                        flux_fill[k][row.dtype, row.shape] = np.full_like(row, flux_val)
+
+        if not _is_dense(pfs_config.filterNames):
+            filter_row_len = np.fromiter(
+                (len(x) for x in pfs_config.filterNames),
+                dtype=np.int32,
+                count=len(pfs_config.filterNames),
+            )
+            filter_fill = {
+                n: [filter_val] * n
+                for n in np.unique(filter_row_len[i_fiber_maskable]).tolist()
+            }
+
+    redact_one = functools.partial(
+        _redact_proposal,
+        pfs_config,
+        dict_mask=dict_mask,
+        flux_keys=flux_keys,
+        flux_val=flux_val,
+        filter_val=filter_val,
+        writable_keys=writable_keys,
+        is_maskable=is_maskable,
+        flux_fill=flux_fill,
+        filter_row_len=filter_row_len,
+        filter_fill=filter_fill,
+    )
+
+    if max_workers is None or max_workers <= 1:
+        for propid_work, i_fiber_propid, n_fiber_work in zip(
+            proposal_ids, i_fiber_by_propid, n_science_by_propid
+        ):
+            yield redact_one(propid_work, i_fiber_propid, n_fiber_work)
+    else:
+        # masking of each proposal ID is independent; threads share pfs_config
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            yield from executor.map(
+                redact_one, proposal_ids, i_fiber_by_propid, n_science_by_propid
+            )
 
-                # Mask values
-                for k, v in dict_mask.items():
-                    getattr(redacted_cfg, k)[i_fiber] = v
 
-                # NOTE: keep the number of elements for flux and filter information
-                for k in flux_keys:
-                    val_mask = np.full_like(getattr(redacted_cfg, k)[i_fiber], flux_val)
-                    getattr(redacted_cfg, k)[i_fiber] = val_mask
+def redact(
+    pfs_config: PfsConfig,
+    cat_id: int = 9000,
+    dict_mask: dict[str, int | str | float] | None = None,
+    flux_keys: Sequence[str] | None = None,
+    flux_val: float | None = None,
+    filter_val: str | None = None,
+    max_workers: int | None = None,
+) -> list[RedactedPfsConfigDataClass]:
+    """
+    Redact the PfsConfig object by masking sensitive information.
 
-                filter_mask = [
-                    filter_val for _ in getattr(redacted_cfg, "filterNames")[i_fiber]
-                ]
-                getattr(redacted_cfg, "filterNames")[i_fiber] = filter_mask
+    Parameters
+    ----------
+    pfs_config : PfsConfig
+        The PfsConfig object to be redacted.
+    cat_id : int, optional
+        The catalog ID to be used for masking. Default is 9000.
+    dict_mask : dict, optional
+        A dictionary defining keys to be masked and their mask values.
+        If not provided, a default dictionary will be used.
+    flux_keys : list, optional
+        A list of keys for flux values to be masked. Default is a list of
+        ["fiberFlux", "psfFlux", "totalFlux", "fiberFluxErr", "psfFluxErr", "totalFluxErr"].
+    flux_val : float, optional
+        The value to be used for masking flux values. Default is np.nan.
+    filter_val : str, optional
+        The value to be used for masking filter values. Default is "none".
+    max_workers : int, optional
+        The maximum number of threads used to redact proposal IDs in
+        parallel. If None or 1 (default), proposal IDs are processed
+        sequentially.
 
-                n_fiber_masked += 1
-            else:
-                # Count unmasked SCIENCE fibers belonging to current proposal
-                if (redacted_cfg.targetType[i_fiber] == TargetType.SCIENCE and 
-                    redacted_cfg.proposalId[i_fiber] == propid_work):
-                    n_fiber_unmasked_science += 1
-                n_fiber_unmasked += 1
-
-        logger.info(f"  Number of SCIENCE fibers for {propid_work}: {n_fiber_work}")
-        logger.info(f"  Number of masked fibers for {propid_work}: {n_fiber_masked}")
-        logger.info(
-            f"  Number of unmasked fibers for {propid_work}: {n_fiber_unmasked}"
-        )
-        logger.info(f"  Number of unmasked SCIENCE fibers: {n_fiber_unmasked_science}")
+    Returns
+    -------
+    list[RedactedPfsConfigDataClass]
+        A list of RedactedPfsConfigDataClass objects containing the redacted
+        PfsConfig objects and their associated proposal IDs.
 
-        if n_fiber_work != n_fiber_unmasked_science:
-            logger.error(
-                f"  Number of SCIENCE fibers for {propid_work} ({n_fiber_work}) does not match the number of unmasked SCIENCE fibers ({n_fiber_unmasked_science})."
-            )
-            raise ValueError(
-                f"Number of SCIENCE fibers for {propid_work} ({n_fiber_work}) does not match the number of unmasked SCIENCE fibers ({n_fiber_unmasked_science})."
-            )
+    See Also
+    --------
+    iter_redact : Generate the redacted PfsConfig objects one at a time.
+
+    Notes
+    -----
+    The redacted PfsConfig objects are shallow copies which share the
+    arrays not modified by masking with ``pfs_config``. If no fiber is
+    masked for a proposal ID, all the arrays are shared. Each object has its
+    own copy of ``header``, but the arrays of the returned objects must be
+    treated as read-only.
+    """
 
-        redacted_pfsconfigs.append(
-            RedactedPfsConfigDataClass(proposal_id=propid_work, pfs_config=redacted_cfg)
+    return list(
+        iter_redact(
+            pfs_config,
+            cat_id=cat_id,
+            dict_mask=dict_mask,
+            flux_keys=flux_keys,
+            flux_val=flux_val,
+            filter_val=filter_val,
+            max_workers=max_workers,
         )
-
-    return redacted_pfsconfigs
+    )
@@ -1,22 +1,149 @@
 #!/usr/bin/env python3
 
+import copy
+import os
+import shutil
+import tempfile
 import pytest
+from dataclasses import dataclass
 import numpy as np
 from pathlib import Path
-from unittest.mock import Mock
+from types import SimpleNamespace
 from pfs.datamodel import PfsConfig, TargetType
 
+import pfsconfig_redaction
+
+
+# Per-fiber attributes filled with default values by _build_mock_pfs_config
+_MOCK_DTYPE = np.dtype([
+    ("tract", "f8"), ("ra", "f8"), ("dec", "f8"),
+    ("pmRa", "f8"), ("pmDec", "f8"), ("parallax", "f8"),
+    ("pfiNominal", "2f8"), ("pfiCenter", "2f8"),
+    ("fiberFlux", "2f8"), ("psfFlux", "2f8"), ("totalFlux", "2f8"),
+    ("fiberFluxErr", "2f8"), ("psfFluxErr", "2f8"), ("totalFluxErr", "2f8"),
+    ("patch", "U8"), ("obCode", "U16"), ("filterNames", "2U4"),
+])
+
+
+def _build_mock_pfs_config(n_fiber, **attrs):
+    """Build a mock PfsConfig with n_fiber SCIENCE fibers and default values.
+
+    The per-fiber attributes are columns of a single structured array. Any
+    attribute can be replaced by passing it as a keyword argument.
+    """
+    values = np.arange(1, n_fiber + 1, dtype="f8")
+    labels = np.arange(1, n_fiber + 1).astype(str)
+
+    arr = np.zeros(n_fiber, dtype=_MOCK_DTYPE)
+    for name in ["tract", "ra", "dec", "pmRa", "pmDec", "parallax"]:
+        arr[name] = values
+    arr["pfiNominal"] = arr["pfiCenter"] = values[:, np.newaxis]
+    flux = np.stack([2 * values - 1, 2 * values], axis=1)
+    for name in ["fiberFlux", "psfFlux", "totalFlux",
+                 "fiberFluxErr", "psfFluxErr", "totalFluxErr"]:
+        arr[name] = flux
+    arr["patch"] = np.char.add(np.char.add(labels, ","), labels)
+    arr["obCode"] = np.char.add("code", labels)
+    arr["filterNames"] = ("g", "r")
+
+    mock_config = SimpleNamespace()
+    mock_config.header = {"FRAMEID": "PFSF00000000", "PROP-ID": "N/A"}
+    mock_config.pfsDesignId = 0x00000000
+    mock_config.designName = "mock_design"
+
+    mock_config.fiberId = np.arange(1, n_fiber + 1)
+    mock_config.targetType = np.full(n_fiber, TargetType.SCIENCE)
+    mock_config.proposalId = np.full(n_fiber, "S25A-001QF")
+    mock_config.catId = np.full(n_fiber, 1000)
+    mock_config.objId = 10 * mock_config.fiberId
+    for name in _MOCK_DTYPE.names:
+        setattr(mock_config, name, arr[name])
+
+    for name, value in attrs.items():
+        setattr(mock_config, name, value)
+
+    return mock_config
+
+
+@pytest.fixture
+def make_mock_pfs_config():
+    """Factory building mock PfsConfig objects; see _build_mock_pfs_config."""
+    return _build_mock_pfs_config
+
+
+@pytest.fixture(scope="session")
+def _prototype_mock():
+    """Mock PfsConfigs built once per session per fiber count; arrays are read-only."""
+    cache = {}
+
+    def prototype(n_fiber):
+        if n_fiber not in cache:
+            mock_config = _build_mock_pfs_config(n_fiber)
+            for name in ["fiberId", "targetType", "proposalId", "catId", "objId",
+                         *_MOCK_DTYPE.names]:
+                getattr(mock_config, name).setflags(write=False)
+            cache[n_fiber] = mock_config
+        return cache[n_fiber]
+
+    return prototype
+
 
 @pytest.fixture
+def fresh_mock(_prototype_mock):
+    """Factory of shallow copies of the prototype mocks; override attributes freely."""
+
+    def factory(n_fiber=3, **attrs):
+        mock_config = copy.copy(_prototype_mock(n_fiber))
+        for name, value in attrs.items():
+            setattr(mock_config, name, value)
+        return mock_config
+
+    return factory
+
+
+@pytest.fixture(scope="session")
 def sample_fits_path():
     """Path to the sample FITS file for testing."""
     return Path("tmp/PFSF12361000.fits")
 
 
+@pytest.fixture(scope="session")
+def loaded_pfs_config(sample_fits_path):
+    """Sample PfsConfig read once per session; redact() does not modify it."""
+    if not sample_fits_path.exists():
+        pytest.skip("Sample FITS file not available")
+    return PfsConfig.readFits(sample_fits_path)
+
+
+@dataclass(frozen=True)
+class PfsConfigSummary:
+    """Precomputed properties of a PfsConfig used in assertions."""
+
+    unique_proposal_ids: np.ndarray
+    sky_count: int
+    fluxstd_count: int
+
+
+@pytest.fixture(scope="session")
+def loaded_pfs_config_summary(loaded_pfs_config):
+    """Summary of the sample PfsConfig computed once per session."""
+    return PfsConfigSummary(
+        unique_proposal_ids=np.unique(loaded_pfs_config.proposalId),
+        sky_count=np.count_nonzero(loaded_pfs_config.targetType == TargetType.SKY),
+        fluxstd_count=np.count_nonzero(loaded_pfs_config.targetType == TargetType.FLUXSTD),
+    )
+
+
+@pytest.fixture(scope="session")
+def default_redacted_configs(loaded_pfs_config):
+    """Sample PfsConfig redacted once per session with the default parameters."""
+    return pfsconfig_redaction.redact(loaded_pfs_config)
+
+
 @pytest.fixture
 def mock_pfs_config():
     """Create a comprehensive mock PfsConfig for testing."""
-    mock_config = Mock(spec=PfsConfig)
+    mock_config = SimpleNamespace()
     
     # Header information
     mock_config.header = {
@@ -99,41 +226,39 @@ def mock_pfs_config():
 @pytest.fixture
 def simple_mock_pfs_config():
     """Create a simple mock PfsConfig for basic testing."""
-    mock_config = Mock(spec=PfsConfig)
-    mock_config.header = {"FRAMEID": "PFSF12345678", "PROP-ID": "S25A-TEST"}
-    mock_config.pfsDesignId = 0x87654321
-    mock_config.designName = "simple_test"
-    
-    # Minimal fiber setup (3 fibers)
-    mock_config.fiberId = np.array([1, 2, 3])
-    mock_config.targetType = np.array([TargetType.SCIENCE, TargetType.SKY, TargetType.SCIENCE])
-    mock_config.proposalId = np.array(["S25A-TEST", "N/A", "S25A-TEST"])
-    mock_config.catId = np.array([1000, 2000, 1000])
-    mock_config.objId = np.array([10, 20, 30])
-    
-    # Minimal required attributes
-    for attr in ["tract", "patch", "ra", "dec", "pmRa", "pmDec", "parallax", 
-                 "obCode", "pfiNominal", "pfiCenter", "fiberFlux", "psfFlux", 
-                 "totalFlux", "fiberFluxErr", "psfFluxErr", "totalFluxErr", "filterNames"]:
-        if attr in ["pfiNominal", "pfiCenter"]:
-            setattr(mock_config, attr, np.array([(1.0, 1.0), (2.0, 2.0), (3.0, 3.0)]))
-        elif attr == "patch":
-            setattr(mock_config, attr, np.array(["1,1", "2,2", "3,3"]))
-        elif attr == "obCode":
-            setattr(mock_config, attr, np.array(["code1", "code2", "code3"]))
-        elif "Flux" in attr:
-            setattr(mock_config, attr, np.array([[1.0, 2.0], [3.0, 4.0], [5.0, 6.0]]))
-        elif attr == "filterNames":
-            setattr(mock_config, attr, np.array([["g", "r"], ["i", "z"], ["g", "i"]]))
-        else:
-            setattr(mock_config, attr, np.array([1.0, 2.0, 3.0]))
-    
-    return mock_config
+    return _build_mock_pfs_config(
+        3,
+        header={"FRAMEID": "PFSF12345678", "PROP-ID": "S25A-TEST"},
+        pfsDesignId=0x87654321,
+        designName="simple_test",
+        # Minimal fiber setup (3 fibers)
+        targetType=np.array([TargetType.SCIENCE, TargetType.SKY, TargetType.SCIENCE]),
+        proposalId=np.array(["S25A-TEST", "N/A", "S25A-TEST"]),
+        catId=np.array([1000, 2000, 1000]),
+        filterNames=np.array([["g", "r"], ["i", "z"], ["g", "i"]]),
+    )
+
+
+@pytest.hookimpl(wrapper=True, tryfirst=True)
+def pytest_runtest_makereport(item, call):
+    """Attach the report of each test phase to the test item, e.g., rep_call."""
+    report = yield
+    setattr(item, f"rep_{report.when}", report)
+    return report
 
 
 @pytest.fixture
-def temp_output_dir(tmp_path):
-    """Create a temporary directory for test outputs."""
-    output_dir = tmp_path / "test_output"
-    output_dir.mkdir()
-    return output_dir
\ No newline at end of file
+def temp_output_dir(request, tmp_path_factory):
+    """Create a temporary directory for test outputs, in RAM if available."""
+    shm = Path("/dev/shm")
+    if shm.is_dir() and os.access(shm, os.W_OK):
+        output_dir = Path(tempfile.mkdtemp(prefix="test_output_", dir=shm))
+        yield output_dir
+        # keep the outputs of a failed test for debugging, as tmp_path does
+        report = getattr(request.node, "rep_call", None)
+        if report is not None and report.failed:
+            print(f"Test outputs kept in {output_dir}")
+        else:
+            shutil.rmtree(output_dir)
+    else:
+        yield tmp_path_factory.mktemp("test_output")
@@ -1,31 +1,25 @@
 #!/usr/bin/env python3
 
+import importlib
+
 import pytest
 
 
 class TestImports:
     """Test that all package imports work correctly."""
     
-    def test_import_main_package(self):
-        """Test importing the main package."""
-        import pfsconfig_redaction
-        assert hasattr(pfsconfig_redaction, 'redact')
-    
-    def test_import_utils_module(self):
-        """Test importing the utils module directly."""
-        from pfsconfig_redaction import utils
-        assert hasattr(utils, 'redact')
-        assert hasattr(utils, 'RedactedPfsConfigDataClass')
-    
-    def test_import_redact_function(self):
-        """Test importing the redact function directly."""
-        from pfsconfig_redaction.utils import redact
-        assert callable(redact)
-    
-    def test_import_dataclass(self):
-        """Test importing the RedactedPfsConfigDataClass."""
-        from pfsconfig_redaction.utils import RedactedPfsConfigDataClass
-        assert RedactedPfsConfigDataClass is not None
+    @pytest.mark.parametrize("module_name, attr", [
+        ("pfsconfig_redaction", "redact"),
+        ("pfsconfig_redaction", "iter_redact"),
+        ("pfsconfig_redaction.utils", "redact"),
+        ("pfsconfig_redaction.utils", "iter_redact"),
+        ("pfsconfig_redaction.utils", "RedactedPfsConfigDataClass"),
+        ("pfsconfig_redaction.utils", "logger"),
+    ])
+    def test_exports(self, module_name, attr):
+        """Test that modules import and provide the expected attributes."""
+        module = importlib.import_module(module_name)
+        assert getattr(module, attr) is not None
     
     def test_all_exports(self):
         """Test that __all__ exports work correctly."""
@@ -38,6 +32,19 @@ class TestImports:
         # Check that exported functions are accessible
         assert hasattr(pfsconfig_redaction, 'redact')
     
+    def test_lazy_import(self):
+        """Test that importing the package does not load the utils module."""
+        import subprocess
+        import sys
+        
+        code = (
+            "import sys, pfsconfig_redaction; "
+            "assert 'pfsconfig_redaction.utils' not in sys.modules; "
+            "pfsconfig_redaction.redact; "
+            "assert 'pfsconfig_redaction.utils' in sys.modules"
+        )
+        subprocess.run([sys.executable, "-c", code], check=True)
+    
     def test_dependencies_available(self):
         """Test that all required dependencies are available."""
         try:
@@ -1,12 +1,14 @@
 #!/usr/bin/env python3
 
+import copy
 import pytest
 import numpy as np
 from pathlib import Path
+from types import SimpleNamespace
 from unittest.mock import Mock, patch
 from pfs.datamodel import PfsConfig, TargetType
 
-from pfsconfig_redaction.utils import redact, RedactedPfsConfigDataClass
+from pfsconfig_redaction.utils import iter_redact, redact, RedactedPfsConfigDataClass
 
 
 class TestRedactedPfsConfigDataClass:
@@ -32,7 +34,7 @@ class TestRedactFunction:
     @pytest.fixture
     def mock_pfs_config(self):
         """Create a mock PfsConfig for testing."""
-        mock_config = Mock(spec=PfsConfig)
+        mock_config = SimpleNamespace()
         mock_config.header = {"FRAMEID": "PFSF12361000", "PROP-ID": "S25A-001QF"}
         mock_config.pfsDesignId = 0x12345678
         mock_config.designName = "test_design"
@@ -79,11 +81,23 @@ class TestRedactFunction:
         
         return mock_config
     
-    @patch('pfsconfig_redaction.utils.copy.deepcopy')
-    def test_redact_default_parameters(self, mock_deepcopy, mock_pfs_config):
-        """Test redact function with default parameters."""
-        mock_deepcopy.return_value = mock_pfs_config
+    @pytest.fixture
+    def mock_pfs_config_na_only(self):
+        """Create a minimal mock PfsConfig whose fibers are all N/A.
         
+        Only the attributes read before redact returns early are set.
+        """
+        return SimpleNamespace(
+            header={"FRAMEID": "PFSF12361000", "PROP-ID": "N/A"},
+            pfsDesignId=0x12345678,
+            designName="test_design",
+            fiberId=np.array([1, 2, 3, 4, 5]),
+            targetType=np.full(5, TargetType.SCIENCE),
+            proposalId=np.full(5, "N/A"),
+        )
+    
+    def test_redact_default_parameters(self, mock_pfs_config):
+        """Test redact function with default parameters."""
         result = redact(mock_pfs_config)
         
         assert isinstance(result, list)
@@ -95,11 +109,8 @@ class TestRedactFunction:
         assert "S25A-002QF" in proposal_ids
         assert "N/A" not in proposal_ids
     
-    @patch('pfsconfig_redaction.utils.copy.deepcopy')
-    def test_redact_custom_parameters(self, mock_deepcopy, mock_pfs_config):
+    def test_redact_custom_parameters(self, mock_pfs_config):
         """Test redact function with custom parameters."""
-        mock_deepcopy.return_value = mock_pfs_config
-        
         custom_dict_mask = {"catId": 8000, "ra": -88, "dec": -88}
         custom_flux_keys = ["fiberFlux", "psfFlux"]
         custom_flux_val = -999.0
@@ -117,44 +128,34 @@ class TestRedactFunction:
         assert isinstance(result, list)
         assert len(result) == 2
     
-    def test_redact_na_proposal_id_skipped(self, mock_pfs_config):
+    def test_redact_na_proposal_id_skipped(self, mock_pfs_config_na_only):
         """Test that N/A proposal IDs are properly skipped."""
-        # Modify mock to have only N/A proposal IDs
-        mock_pfs_config.proposalId = np.array(["N/A", "N/A", "N/A", "N/A", "N/A"])
-        
-        result = redact(mock_pfs_config)
+        result = redact(mock_pfs_config_na_only)
         
         assert isinstance(result, list)
         assert len(result) == 0  # No valid proposal IDs to process
     
-    @patch('pfsconfig_redaction.utils.copy.deepcopy')
-    def test_redact_fiber_count_validation(self, mock_deepcopy, mock_pfs_config):
+    @patch('pfsconfig_redaction.utils._fast_clone')
+    def test_redact_fiber_count_validation(self, mock_clone, mock_pfs_config):
         """Test that fiber count validation works correctly."""
-        # Create a corrupted copy where targetType gets modified during deepcopy
+        # Create a corrupted copy where targetType gets modified during copying
         # to simulate a scenario where counts don't match
-        corrupted_copy = Mock(spec=PfsConfig)
-        
-        # Copy all attributes from original
-        for attr in ['header', 'pfsDesignId', 'designName', 'fiberId', 'proposalId', 
-                     'catId', 'objId', 'tract', 'patch', 'ra', 'dec', 'pmRa', 'pmDec', 
-                     'parallax', 'obCode', 'pfiNominal', 'pfiCenter', 'fiberFlux', 
-                     'psfFlux', 'totalFlux', 'fiberFluxErr', 'psfFluxErr', 'totalFluxErr', 
-                     'filterNames']:
-            if hasattr(mock_pfs_config, attr):
-                setattr(corrupted_copy, attr, getattr(mock_pfs_config, attr))
-        
         # Modify the corrupted copy to have a different targetType that creates mismatch
         # Original: S25A-002QF has 1 SCIENCE fiber (position 1)
         # Corrupted: S25A-002QF fiber becomes SKY, creating 0 unmasked SCIENCE fibers
-        corrupted_copy.targetType = np.array([
-            TargetType.SCIENCE,    # fiber 1: S25A-001QF
-            TargetType.SKY,        # fiber 2: S25A-002QF - Changed from SCIENCE 
-            TargetType.SKY,        # fiber 3: N/A
-            TargetType.FLUXSTD,    # fiber 4: N/A
-            TargetType.SCIENCE     # fiber 5: S25A-001QF
-        ])
+        # The other attributes are copied since redact masks the copy in place
+        corrupted_copy = SimpleNamespace(**{
+            **{k: copy.copy(v) for k, v in vars(mock_pfs_config).items()},
+            "targetType": np.array([
+                TargetType.SCIENCE,    # fiber 1: S25A-001QF
+                TargetType.SKY,        # fiber 2: S25A-002QF - Changed from SCIENCE 
+                TargetType.SKY,        # fiber 3: N/A
+                TargetType.FLUXSTD,    # fiber 4: N/A
+                TargetType.SCIENCE     # fiber 5: S25A-001QF
+            ]),
+        })
         
-        mock_deepcopy.return_value = corrupted_copy
+        mock_clone.return_value = corrupted_copy
         
         with pytest.raises(ValueError, match="Number of SCIENCE fibers"):
             redact(mock_pfs_config)
@@ -171,6 +172,153 @@ class TestRedactFunction:
         
         assert isinstance(result, list)
 
+    def test_redact_does_not_modify_input(self, mock_pfs_config):
+        """Test that masking is applied to copies and the input is left intact."""
+        original_proposal_id = mock_pfs_config.proposalId.copy()
+        original_ra = mock_pfs_config.ra.copy()
+        original_flux = mock_pfs_config.fiberFlux.copy()
+
+        result = redact(mock_pfs_config)
+
+        assert len(result) == 2
+        np.testing.assert_array_equal(mock_pfs_config.proposalId, original_proposal_id)
+        np.testing.assert_array_equal(mock_pfs_config.ra, original_ra)
+        np.testing.assert_array_equal(mock_pfs_config.fiberFlux, original_flux)
+        for item in result:
+            assert item.pfs_config is not mock_pfs_config
+            assert item.pfs_config.proposalId is not mock_pfs_config.proposalId
+
+    def test_redact_max_workers(self, mock_pfs_config):
+        """Test that threaded redaction gives the same results in the same order."""
+        serial = redact(mock_pfs_config)
+        threaded = redact(mock_pfs_config, max_workers=2)
+
+        assert [item.proposal_id for item in threaded] == [item.proposal_id for item in serial]
+        for item_serial, item_threaded in zip(serial, threaded):
+            np.testing.assert_array_equal(
+                item_threaded.pfs_config.proposalId, item_serial.pfs_config.proposalId
+            )
+            np.testing.assert_array_equal(
+                item_threaded.pfs_config.fiberFlux, item_serial.pfs_config.fiberFlux
+            )
+
+    def test_redact_header_not_shared(self, mock_pfs_config):
+        """Test that each redacted PfsConfig has its own copy of the header."""
+        result = redact(mock_pfs_config)
+
+        for item in result:
+            item.pfs_config.header["PROP-ID"] = item.proposal_id
+
+        assert mock_pfs_config.header["PROP-ID"] == "S25A-001QF"
+        assert [item.pfs_config.header["PROP-ID"] for item in result] == [
+            item.proposal_id for item in result
+        ]
+
+    def test_iter_redact(self, mock_pfs_config):
+        """Test that iter_redact lazily yields the same results as redact."""
+        expected = redact(mock_pfs_config)
+        generated = iter_redact(mock_pfs_config)
+
+        assert not isinstance(generated, list)
+        first = next(generated)
+        assert isinstance(first, RedactedPfsConfigDataClass)
+
+        result = [first, *generated]
+        assert [item.proposal_id for item in result] == [item.proposal_id for item in expected]
+        for item, item_expected in zip(result, expected):
+            np.testing.assert_array_equal(
+                item.pfs_config.proposalId, item_expected.pfs_config.proposalId
+            )
+
+    def test_redact_dense_flux_and_filters(self, mock_pfs_config):
+        """Test masking of flux values and filter names stored as 2-D arrays."""
+        # wide enough to hold the mask value "none"
+        mock_pfs_config.filterNames = mock_pfs_config.filterNames.astype("U4")
+
+        result = redact(mock_pfs_config)
+        redacted = {item.proposal_id: item.pfs_config for item in result}
+
+        # fibers 1 and 5 (S25A-001QF) are masked in the output for S25A-002QF
+        cfg_002 = redacted["S25A-002QF"]
+        for k in ["fiberFlux", "psfFlux", "totalFlux",
+                  "fiberFluxErr", "psfFluxErr", "totalFluxErr"]:
+            flux = getattr(cfg_002, k)
+            assert flux.shape == (5, 2)
+            assert np.all(np.isnan(flux[[0, 4]]))
+            np.testing.assert_array_equal(flux[1:4], getattr(mock_pfs_config, k)[1:4])
+        assert np.all(cfg_002.filterNames[[0, 4]] == "none")
+        np.testing.assert_array_equal(cfg_002.filterNames[1], ["r", "i"])
+        assert np.all(np.isnan(cfg_002.pfiNominal[[0, 4]]))
+        np.testing.assert_array_equal(cfg_002.objId, [-1, 20, 30, 40, -5])
+        np.testing.assert_array_equal(
+            cfg_002.targetType,
+            [TargetType.SCIENCE_MASKED, TargetType.SCIENCE, TargetType.SKY,
+             TargetType.FLUXSTD, TargetType.SCIENCE_MASKED],
+        )
+
+    def test_redact_ragged_flux_and_filters(self, mock_pfs_config):
+        """Test masking of per-fiber flux arrays and filter names stored as lists."""
+        mock_pfs_config.fiberFlux = [np.array([1.0, 2.0]), np.array([3.0]),
+                                     np.array([5.0, 6.0]), np.array([7.0]),
+                                     np.array([9.0, 10.0])]
+        mock_pfs_config.filterNames = [["g", "r"], ["r"], ["i", "z"], ["z"], ["g", "i"]]
+
+        result = redact(mock_pfs_config)
+        redacted = {item.proposal_id: item.pfs_config for item in result}
+
+        # fiber 2 (S25A-002QF) is masked in the output for S25A-001QF
+        cfg_001 = redacted["S25A-001QF"]
+        assert cfg_001.proposalId[1] == "masked"
+        assert cfg_001.objId[1] == -2
+        assert np.all(np.isnan(cfg_001.fiberFlux[1]))
+        assert len(cfg_001.fiberFlux[1]) == 1
+        assert cfg_001.filterNames[1] == ["none"]
+        np.testing.assert_array_equal(cfg_001.fiberFlux[0], [1.0, 2.0])
+        assert cfg_001.filterNames[0] == ["g", "r"]
+
+        # fibers 1 and 5 (S25A-001QF) are masked in the output for S25A-002QF
+        cfg_002 = redacted["S25A-002QF"]
+        assert list(cfg_002.proposalId) == ["masked", "S25A-002QF", "N/A", "N/A", "masked"]
+        assert cfg_002.filterNames[4] == ["none", "none"]
+        assert cfg_002.targetType[2] == TargetType.SKY
+
+    def test_redact_1d_flux(self, mock_pfs_config):
+        """Test masking of flux values stored as a 1-D array."""
+        mock_pfs_config.fiberFlux = np.array([1.0, 2.0, 3.0, 4.0, 5.0])
+
+        result = redact(mock_pfs_config)
+        redacted = {item.proposal_id: item.pfs_config for item in result}
+
+        # fibers 1 and 5 (S25A-001QF) are masked in the output for S25A-002QF
+        flux = redacted["S25A-002QF"].fiberFlux
+        assert flux.shape == (5,)
+        assert np.all(np.isnan(flux[[0, 4]]))
+        np.testing.assert_array_equal(flux[1:4], [2.0, 3.0, 4.0])
+
+    def test_redact_ragged_flux_mixed_dtypes(self, mock_pfs_config):
+        """Test that masked ragged flux rows keep their own dtype and shape."""
+        mock_pfs_config.fiberFlux = [np.array([1.0, 2.0], dtype=np.float32),
+                                     np.array([3.0]),
+                                     np.array([5.0, 6.0]), np.array([7.0]),
+                                     np.array([[9.0, 10.0]], dtype=np.float32)]
+
+        result = redact(mock_pfs_config)
+        redacted = {item.proposal_id: item.pfs_config for item in result}
+
+        # fiber 2 (S25A-002QF) is masked in the output for S25A-001QF
+        row = redacted["S25A-001QF"].fiberFlux[1]
+        assert row.dtype == np.float64
+        assert row.shape == (1,)
+        assert np.all(np.isnan(row))
+
+        # fibers 1 and 5 (S25A-001QF) are masked in the output for S25A-002QF
+        cfg_002 = redacted["S25A-002QF"]
+        for i_fiber, shape in [(0, (2,)), (4, (1, 2))]:
+            row = cfg_002.fiberFlux[i_fiber]
+            assert row.dtype == np.float32
+            assert row.shape == shape
+            assert np.all(np.isnan(row))
+
 
 class TestRedactIntegration:
     """Integration tests for the redact function with real-like data."""